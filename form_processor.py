@@ -1,22 +1,88 @@
 import os
+# Keep each Tesseract process single-threaded; pages are already OCRed in parallel.
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
 import re
-import json
+import orjson
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import functools
+import hashlib
+import threading
 import sqlite3
 import argparse
-import pytesseract
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+import aiopytesseract
+from aiopytesseract.exceptions import TesseractRuntimeError, TesseractTimeoutError
 import shutil
+import tempfile
 import cv2
+import fitz
 import numpy as np
 from PIL import Image
-from pdf2image import convert_from_path
 
-# Ensure Tesseract is installed
-if not shutil.which("tesseract"):
+try:
+    from tesserocr import PyTessBaseAPI, PSM
+except ImportError:
+    PyTessBaseAPI = None
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+TESSERACT_CMD = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+
+# Ensure Tesseract is installed, preferring the default install path over a PATH lookup
+if os.path.isfile(TESSERACT_CMD):
+    # aiopytesseract runs plain "tesseract", so expose the install directory to it.
+    os.environ["PATH"] = os.path.dirname(TESSERACT_CMD) + os.pathsep + os.environ.get("PATH", "")
+elif not shutil.which("tesseract"):
     raise RuntimeError("Tesseract is not installed. Install it from https://github.com/UB-Mannheim/tesseract/wiki")
 
 class FormProcessor:
-    def __init__(self):
+    # Label and value pattern for every fixed field. __init__ compiles each one with
+    # the value as group 1.
+    _FIELDS = {
+        "patient_name": (r"Patient Name\s*:\s*", r".*"),
+        "dob": (r"DOB\s*:\s*", r".*"),
+        "date": (r"Date\s*:\s*", r".*"),
+        "injection": (r"INJECTION\s*:\s*", r"YES|NO"),
+        "exercise_therapy": (r"Exercise Therapy\s*:\s*", r"YES|NO"),
+        # The rest of the line plus up to 20 blank or indented continuation lines, ending
+        # where the next heading starts. Bounded so long whitespace runs can't backtrack.
+        "since_last_treatment": (r"Patient changes since last treatment:", r"[^\n]*(?:\n(?!\S)[^\n]*){0,20}(?=\n\S)"),
+        "since_start_of_treatment": (r"Patient changes since the start of treatment:", r"[^\n]*(?:\n(?!\S)[^\n]*){0,20}(?=\n\S)"),
+        "last_3_days": (r"Describe any functional changes within the last three days \(good or bad\):", r".*"),
+        "blood_pressure": (r"Blood Pressure\s*:\s*", r".*"),
+        # Vitals are at most four digits. A longer OCR misread reads as missing rather
+        # than truncated, and it can't overflow the 64-bit ints orjson encodes.
+        "hr": (r"HR\s*:\s*", r"\d{1,4}(?!\d)"),
+        "weight": (r"Weight\s*:\s*", r"\d{1,4}(?!\d)"),
+        "height": (r"Height\s*:\s*", r".*"),
+        "spo2": (r"SpO2\s*:\s*", r"\d{1,4}(?!\d)"),
+        "temperature": (r"Temperature\s*:\s*", r".*"),
+        "blood_glucose": (r"Blood Glucose\s*:\s*", r"\d{1,4}(?!\d)"),
+        "respirations": (r"Respirations\s*:\s*", r"\d{1,4}(?!\d)"),
+    }
+
+    # Fields converted to int as they are scanned; everything else is stripped text.
+    _CASTERS = {"hr": int, "weight": int, "spo2": int, "blood_glucose": int, "respirations": int}
+
+    # Longest page side, in pixels, fed to Tesseract unless a target DPI is requested.
+    _MAX_SIDE = 2000
+
+    def __init__(self, use_tesserocr=False, target_dpi=None, ocr_workers=None, threshold='adaptive'):
+        if threshold not in ('adaptive', 'otsu'):
+            raise ValueError(f"Unknown threshold method '{threshold}', expected 'adaptive' or 'otsu'.")
+        self.threshold = threshold
+        self.target_dpi = target_dpi
+        self.ocr_workers = ocr_workers or os.cpu_count() or 1
+        self.api = None
+        if use_tesserocr:
+            if PyTessBaseAPI is None:
+                raise RuntimeError("tesserocr is not installed. Install it with 'pip install tesserocr'")
+            # One engine kept alive for every page and form this processor handles.
+            self.api = PyTessBaseAPI(lang='eng', psm=PSM.AUTO)
+
         self.difficulty_tasks = [
             "bending_or_stooping", "putting_on_shoes", "sleeping",
             "standing_for_an_hour", "stairs", "walking_through_store",
@@ -24,99 +90,234 @@ class FormProcessor:
         ]
         self.pain_symptoms = ["pain", "numbness", "tingling", "burning", "tightness"]
 
+        fields = dict(self._FIELDS)
+        fields.update({f"diff_{task}": (rf"{task.replace('_', ' ').title()}:\s*", r"[0-5]") for task in self.difficulty_tasks})
+        fields.update({f"sym_{symptom}": (rf"{symptom.title()}:\s*", r"[0-9]{1,2}") for symptom in self.pain_symptoms})
+        self._casters = dict(self._CASTERS)
+        self._casters.update((name, int) for name in fields if name.startswith(("diff_", "sym_")))
+        # One precompiled pattern per field. Separate searches keep re's literal-prefix
+        # scan, which a fused alternation of all fields loses.
+        self._patterns = {name: re.compile(f"{label}({value})") for name, (label, value) in fields.items()}
+
     def enhance_image(self, image):
-        """Improve OCR accuracy by converting to grayscale, applying blur, and thresholding."""
-        img = np.array(image)
-        gray = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-        _, binary = cv2.threshold(blurred, 128, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        return Image.fromarray(binary)
+        """Improve OCR accuracy by converting to grayscale and thresholding (adaptive by default, or Otsu)."""
+        gray = np.asarray(image)
+        # Image files arrive already grayscale; rendered PDF pages are RGB.
+        if gray.ndim == 3:
+            gray = cv2.cvtColor(gray, cv2.COLOR_RGB2GRAY)
+        if self.target_dpi is None:
+            # Form labels OCR fine well below 300 DPI and Tesseract time grows with pixel count.
+            h, w = gray.shape
+            scale = min(1.0, self._MAX_SIDE / max(h, w))
+            if scale < 1:
+                gray = cv2.resize(gray, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+        if self.threshold == 'otsu':
+            # The original blur-then-Otsu pipeline; the box blur removes speckle before the global cut.
+            blurred = cv2.boxFilter(gray, -1, (5, 5))
+            _, binary = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            return binary
+        # Adaptive mean thresholding averages locally, so no separate blur pass is needed,
+        # and it copes with uneven lighting better than one global Otsu cut.
+        return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY, 31, 10)
+
+    async def _ocr_page(self, image, sem, dpi=0, timeout=30):
+        """OCR PNG bytes or an image/list file path, holding the semaphore while Tesseract runs.
+
+        dpi is the real resolution of the image; 0 leaves Tesseract to estimate it.
+        """
+        async with sem:
+            return await aiopytesseract.image_to_string(image, dpi=dpi, timeout=timeout)
+
+    async def _ocr_with_retry(self, image, sem, dpi=0, timeout=30, attempts=3):
+        """OCR with exponential backoff, so a Tesseract run that fails under load is retried."""
+        backoff = 0.2
+        for attempt in range(attempts):
+            try:
+                return await self._ocr_page(image, sem, dpi, timeout)
+            except (TesseractRuntimeError, TesseractTimeoutError):
+                if attempt == attempts - 1:
+                    raise
+            # Back off outside the semaphore so other pages keep the slot busy.
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 5.0)
+
+    async def _ocr_batches(self, pages, tmp):
+        """OCR rendered (path, dpi) pages as list-file batches, one Tesseract process per OCR worker."""
+        if not pages:
+            return ""
+        workers = self.ocr_workers
+        size = -(-len(pages) // workers)
+        # --dpi applies to a whole invocation, so a batch only holds consecutive pages
+        # rendered at the same resolution.
+        batches = []
+        for page_path, dpi in pages:
+            if batches and batches[-1][1] == dpi and len(batches[-1][0]) < size:
+                batches[-1][0].append(page_path)
+            else:
+                batches.append(([page_path], dpi))
+
+        list_paths = []
+        for i, (batch, _) in enumerate(batches):
+            list_path = os.path.join(tmp, f"list_{i}.txt")
+            with open(list_path, 'w') as f:
+                f.write("\n".join(batch) + "\n")
+            list_paths.append(list_path)
+
+        # Tesseract (4.1+) writes a form feed only between the pages of one batch, so
+        # batches are joined with one too; the text then doesn't depend on how pages split.
+        sem = asyncio.Semaphore(workers)
+        texts = await asyncio.gather(*[
+            self._ocr_with_retry(list_path, sem, dpi=dpi, timeout=30 * len(batch))
+            for list_path, (batch, dpi) in zip(list_paths, batches)
+        ])
+        return "\f".join(texts)
+
+    def _load_image(self, file_path):
+        """Decode an image file straight to grayscale, using PIL for formats OpenCV can't read."""
+        gray = cv2.imread(file_path, cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            gray = np.asarray(Image.open(file_path).convert('L'))
+        return gray
+
+    def _render_pdf(self, file_path):
+        """Yield each PDF page rendered by MuPDF and enhanced for OCR, with its final DPI."""
+        render_dpi = self.target_dpi or 200
+        with fitz.open(file_path) as doc:
+            for page in doc:
+                pix = page.get_pixmap(dpi=render_dpi)
+                # Hand the RGB samples straight to OpenCV, no PIL round trip.
+                img = np.frombuffer(pix.samples, np.uint8).reshape(pix.h, pix.w, pix.n)
+                binary = self.enhance_image(img)
+                # enhance_image may have downscaled the page; report the resolution it ended at.
+                yield binary, round(render_dpi * binary.shape[1] / pix.w)
+
+    async def _extract_text_async(self, file_path):
+        if file_path.lower().endswith('.pdf'):
+            with tempfile.TemporaryDirectory() as tmp:
+                pages = []
+                for i, (img, dpi) in enumerate(self._render_pdf(file_path)):
+                    page_path = os.path.join(tmp, f"page_{i}.png")
+                    # imencode + open() instead of imwrite, which fails silently and
+                    # mishandles non-ASCII temp paths on Windows.
+                    ok, png = cv2.imencode('.png', img)
+                    if not ok:
+                        raise RuntimeError(f"Could not encode page {i + 1} of '{file_path}' as PNG.")
+                    with open(page_path, 'wb') as f:
+                        f.write(png.tobytes())
+                    pages.append((page_path, dpi))
+                return await self._ocr_batches(pages, tmp)
+
+        # An image file's scan resolution is unknown, so Tesseract estimates it.
+        _, png = cv2.imencode('.png', self.enhance_image(self._load_image(file_path)))
+        return await self._ocr_with_retry(png.tobytes(), asyncio.Semaphore(1), dpi=0)
+
+    def _extract_text_tesserocr(self, file_path):
+        if file_path.lower().endswith('.pdf'):
+            images = self._render_pdf(file_path)
+        else:
+            images = [(self.enhance_image(self._load_image(file_path)), 0)]
+
+        pages = []
+        for img, dpi in images:
+            self.api.SetImage(Image.fromarray(img))
+            if dpi:
+                self.api.SetSourceResolution(dpi)
+            pages.append(self.api.GetUTF8Text())
+        # Match the form feed the Tesseract CLI puts between pages.
+        return "\f".join(pages)
 
     def extract_text(self, file_path):
         """Extract text from a PDF or image."""
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"File '{file_path}' not found.")
 
-        text = ""
-        if file_path.lower().endswith('.pdf'):
-            images = convert_from_path(file_path)
-            for img in images:
-                processed_img = self.enhance_image(img)
-                text += pytesseract.image_to_string(processed_img)
-        else:
-            img = Image.open(file_path)
-            processed_img = self.enhance_image(img)
-            text = pytesseract.image_to_string(processed_img)
+        if self.api is not None:
+            return self._extract_text_tesserocr(file_path).strip()
+        return asyncio.run(self._extract_text_async(file_path)).strip()
 
-        return text.strip()
+    def close(self):
+        """Release the persistent Tesseract engine, if one was started."""
+        if self.api is not None:
+            self.api.End()
+            self.api = None
 
     def parse_ocr_output(self, text):
         """Extract structured data from OCR text."""
+        fields = self._scan_fields(text)
         return {
-            "patient_details": self._extract_patient_info(text),
-            "treatment_details": self._extract_treatment_info(text),
-            "difficulty_ratings": self._extract_difficulty_ratings(text),
-            "patient_changes": self._extract_patient_changes(text),
-            "pain_symptoms": self._extract_pain_symptoms(text),
-            "medical_assistant_data": self._extract_ma_data(text)
+            "patient_details": self._extract_patient_info(fields),
+            "treatment_details": self._extract_treatment_info(fields),
+            "difficulty_ratings": self._extract_difficulty_ratings(fields),
+            "patient_changes": self._extract_patient_changes(fields),
+            "pain_symptoms": self._extract_pain_symptoms(fields),
+            "medical_assistant_data": self._extract_ma_data(fields)
         }
 
-    def _extract_patient_info(self, text):
+    def _scan_fields(self, text):
+        """Search the text for each field, converting the first hit with its caster."""
+        fields = {}
+        casters = self._casters
+        for name, pattern in self._patterns.items():
+            match = pattern.search(text)
+            if match:
+                fields[name] = casters.get(name, str.strip)(match.group(1))
+        return fields
+
+    def _extract_patient_info(self, fields):
         return {
-            "patient_name": self._find_value(r"Patient Name\s*:\s*(.*)", text),
-            "dob": self._find_value(r"DOB\s*:\s*(.*)", text)
+            "patient_name": fields.get("patient_name"),
+            "dob": fields.get("dob")
         }
 
-    def _extract_treatment_info(self, text):
+    def _extract_treatment_info(self, fields):
         return {
-            "date": self._find_value(r"Date\s*:\s*(.*)", text),
-            "injection": self._find_checkbox(r"INJECTION\s*:\s*(YES|NO)", text),
-            "exercise_therapy": self._find_checkbox(r"Exercise Therapy\s*:\s*(YES|NO)", text)
+            "date": fields.get("date"),
+            "injection": fields.get("injection"),
+            "exercise_therapy": fields.get("exercise_therapy")
         }
 
-    def _extract_difficulty_ratings(self, text):
-        return {task: self._find_numeric_value(rf"{task.replace('_', ' ').title()}:\s*([0-5])", text) for task in self.difficulty_tasks}
+    def _extract_difficulty_ratings(self, fields):
+        return {task: fields.get(f"diff_{task}") for task in self.difficulty_tasks}
 
-    def _extract_patient_changes(self, text):
+    def _extract_patient_changes(self, fields):
         return {
-            "since_last_treatment": self._find_value(r"Patient changes since last treatment:(.*?)(?=\n\S)", text, True),
-            "since_start_of_treatment": self._find_value(r"Patient changes since the start of treatment:(.*?)(?=\n\S)", text, True),
-            "last_3_days": self._find_value(r"Describe any functional changes within the last three days \(good or bad\):(.*)", text)
+            "since_last_treatment": fields.get("since_last_treatment"),
+            "since_start_of_treatment": fields.get("since_start_of_treatment"),
+            "last_3_days": fields.get("last_3_days")
         }
 
-    def _extract_pain_symptoms(self, text):
-        return {symptom: self._find_numeric_value(rf"{symptom.title()}:\s*([0-9]{{1,2}})", text) for symptom in self.pain_symptoms}
+    def _extract_pain_symptoms(self, fields):
+        return {symptom: fields.get(f"sym_{symptom}") for symptom in self.pain_symptoms}
 
-    def _extract_ma_data(self, text):
+    def _extract_ma_data(self, fields):
         return {
-            "blood_pressure": self._find_value(r"Blood Pressure\s*:\s*(.*)", text),
-            "hr": self._find_numeric_value(r"HR\s*:\s*(\d+)", text),
-            "weight": self._find_numeric_value(r"Weight\s*:\s*(\d+)", text),
-            "height": self._find_value(r"Height\s*:\s*(.*)", text),
-            "spo2": self._find_numeric_value(r"SpO2\s*:\s*(\d+)", text),
-            "temperature": self._find_value(r"Temperature\s*:\s*(.*)", text),
-            "blood_glucose": self._find_numeric_value(r"Blood Glucose\s*:\s*(\d+)", text),
-            "respirations": self._find_numeric_value(r"Respirations\s*:\s*(\d+)", text)
+            "blood_pressure": fields.get("blood_pressure"),
+            "hr": fields.get("hr"),
+            "weight": fields.get("weight"),
+            "height": fields.get("height"),
+            "spo2": fields.get("spo2"),
+            "temperature": fields.get("temperature"),
+            "blood_glucose": fields.get("blood_glucose"),
+            "respirations": fields.get("respirations")
         }
 
-    def _find_value(self, pattern, text, dotall=False):
-        match = re.search(pattern, text, re.DOTALL if dotall else 0)
-        return match.group(1).strip() if match else None
-
-    def _find_numeric_value(self, pattern, text):
-        match = re.search(pattern, text)
-        return int(match.group(1)) if match else None
-
-    def _find_checkbox(self, pattern, text):
-        match = re.search(pattern, text)
-        return match.group(1) if match else None
-
 class DatabaseManager:
-    def __init__(self, db_path='patients.db'):
-        self.conn = sqlite3.connect(db_path)
+    """SQLite store for parsed forms.
+
+    The connection belongs to the thread that opened it. Pass
+    check_same_thread=False to share one manager across threads; writes are
+    then serialized through an internal lock.
+    """
+    def __init__(self, db_path='patients.db', check_same_thread=True):
+        self.conn = sqlite3.connect(db_path, check_same_thread=check_same_thread)
+        self._lock = threading.Lock()
         self._create_tables()
 
     def _create_tables(self):
+        # WAL with synchronous=NORMAL syncs at checkpoints rather than on every commit.
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA temp_store=MEMORY')
         self.conn.execute('''
             CREATE TABLE IF NOT EXISTS patients (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -133,38 +334,182 @@ class DatabaseManager:
                 FOREIGN KEY(patient_id) REFERENCES patients(id)
             )
         ''')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS ocr_cache (
+                hash TEXT PRIMARY KEY,
+                form_json TEXT
+            )
+        ''')
         self.conn.commit()
 
     def insert_data(self, data):
-        cur = self.conn.cursor()
-        cur.execute('INSERT INTO patients (name, dob) VALUES (?, ?)',
-                    (data['patient_details'].get('patient_name', 'Unknown'), data['patient_details'].get('dob', 'Unknown')))
-        patient_id = cur.lastrowid
-        cur.execute('INSERT INTO forms_data (patient_id, form_json) VALUES (?, ?)',
-                    (patient_id, json.dumps(data)))
-        self.conn.commit()
-        return patient_id
-
-def process_file(input_path, output_json='output.json'):
-    processor = FormProcessor()
-    db = DatabaseManager()
-    
+        return self.insert_many([data])[0]
+
+    def insert_many(self, forms):
+        """Insert several parsed forms in a single transaction and return their patient ids."""
+        forms = list(forms)
+        patient_ids = []
+        with self._lock, self.conn:
+            cur = self.conn.cursor()
+            for data in forms:
+                cur.execute('INSERT INTO patients (name, dob) VALUES (?, ?)',
+                            (data['patient_details'].get('patient_name', 'Unknown'), data['patient_details'].get('dob', 'Unknown')))
+                patient_ids.append(cur.lastrowid)
+            cur.executemany('INSERT INTO forms_data (patient_id, form_json) VALUES (?, ?)',
+                            [(patient_id, orjson.dumps(data).decode()) for patient_id, data in zip(patient_ids, forms)])
+        return patient_ids
+
+    def get_cached(self, key):
+        """Return the parsed form previously stored under this cache key, or None."""
+        row = self.conn.execute('SELECT form_json FROM ocr_cache WHERE hash = ?', (key,)).fetchone()
+        return orjson.loads(row[0]) if row else None
+
+    def cache_result(self, key, data):
+        self.cache_many([(key, data)])
+
+    def cache_many(self, items):
+        """Store (cache key, parsed form) pairs in a single transaction."""
+        with self._lock, self.conn:
+            self.conn.executemany('INSERT OR REPLACE INTO ocr_cache (hash, form_json) VALUES (?, ?)',
+                                  [(key, orjson.dumps(data).decode()) for key, data in items])
+
+def _hash_file(path, chunk_size=1 << 20):
+    """Content hash of a file, read in 1 MiB chunks so large PDFs never sit in memory."""
+    if xxhash is not None:
+        name, h = "xxh3_64", xxhash.xxh3_64()
+    else:
+        name, h = "blake2b", hashlib.blake2b()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return f"{name}:{h.hexdigest()}"
+
+# Bump whenever OCR or parsing changes, so results cached by older code are recomputed.
+_PIPELINE_VERSION = 1
+
+def _cache_key(path, use_tesserocr, target_dpi, threshold):
+    """OCR cache key: file content hash plus the pipeline version and every setting that changes output."""
+    return f"{_hash_file(path)}|v{_PIPELINE_VERSION}|tesserocr={use_tesserocr}|dpi={target_dpi}|threshold={threshold}"
+
+@functools.lru_cache(maxsize=1)
+def _get_processor(use_tesserocr=False, target_dpi=None, ocr_workers=None, threshold='adaptive'):
+    # Reused across files so compiled patterns and any tesserocr engine are built once.
+    return FormProcessor(use_tesserocr=use_tesserocr, target_dpi=target_dpi, ocr_workers=ocr_workers, threshold=threshold)
+
+@functools.lru_cache(maxsize=1)
+def _get_db():
+    return DatabaseManager()
+
+def _extract_data(input_path, use_tesserocr=False, target_dpi=None, ocr_workers=None, threshold='adaptive'):
+    processor = _get_processor(use_tesserocr, target_dpi, ocr_workers, threshold)
     text = processor.extract_text(input_path)
-    data = processor.parse_ocr_output(text)
+    return processor.parse_ocr_output(text)
+
+def _write_json(data, output_json):
+    with open(output_json, 'wb') as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+
+def _output_names(paths):
+    """One JSON file name per input, adding _1, _2, ... where file stems collide."""
+    used = set()
+    names = []
+    for path in paths:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        name, n = stem, 0
+        # Compare case-insensitively so names stay distinct on Windows filesystems too.
+        while name.lower() in used:
+            n += 1
+            name = f"{stem}_{n}"
+        used.add(name.lower())
+        names.append(name + '.json')
+    return names
+
+def process_file(input_path, output_json='output.json', use_tesserocr=False, target_dpi=None, threshold='adaptive'):
+    db = _get_db()
+    # Re-submitted scans processed with the same settings are served from the cache.
+    key = _cache_key(input_path, use_tesserocr, target_dpi, threshold)
+    data = db.get_cached(key)
+    if data is None:
+        data = _extract_data(input_path, use_tesserocr, target_dpi, None, threshold)
+        db.cache_result(key, data)
+    _write_json(data, output_json)
 
-    with open(output_json, 'w') as f:
-        json.dump(data, f, indent=2)
-    
     db.insert_data(data)
     print(f"✅ Data processed and saved to {output_json} and database.")
 
+def process_files(paths, output_dir, use_tesserocr=False, target_dpi=None, threshold='adaptive'):
+    """Process many forms in parallel worker processes.
+
+    Files already in the OCR cache, and repeats within the batch, are not sent
+    to the workers. Workers only run OCR and parsing, one Tesseract process
+    each. This process writes the JSON files and is the single SQLite writer,
+    storing the whole batch in one transaction. Inputs whose file names clash,
+    such as a/form.pdf and b/form.pdf, get numbered JSON names instead of
+    overwriting each other. A file that fails does not stop the batch: every
+    other form is still cached, written and stored, then a RuntimeError lists
+    the failures.
+    """
+    paths = list(paths)
+    os.makedirs(output_dir, exist_ok=True)
+    db = _get_db()
+    keys = [_cache_key(path, use_tesserocr, target_dpi, threshold) for path in paths]
+    results = {}
+    pending = {}
+    for path, key in zip(paths, keys):
+        if key in results or key in pending:
+            continue
+        cached = db.get_cached(key)
+        if cached is None:
+            pending[key] = path
+        else:
+            results[key] = cached
+
+    failures = {}
+    if pending:
+        extract = functools.partial(_extract_data, use_tesserocr=use_tesserocr, target_dpi=target_dpi, ocr_workers=1,
+                                    threshold=threshold)
+        # Windows caps ProcessPoolExecutor at 61 workers.
+        workers = min(len(pending), os.cpu_count() or 1, 61)
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            futures = {ex.submit(extract, path): key for key, path in pending.items()}
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    results[key] = future.result()
+                except Exception as e:
+                    failures[pending[key]] = e
+        db.cache_many((key, results[key]) for key in pending if key in results)
+
+    forms = []
+    for name, key in zip(_output_names(paths), keys):
+        if key not in results:
+            continue
+        data = results[key]
+        _write_json(data, os.path.join(output_dir, name))
+        forms.append(data)
+
+    db.insert_many(forms)
+    print(f"✅ {len(forms)} forms processed and saved to {output_dir} and database.")
+    if failures:
+        details = "\n".join(f"  {path}: {e}" for path, e in failures.items())
+        raise RuntimeError(f"{len(failures)} of {len(paths)} forms failed:\n{details}")
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Process patient assessment forms")
-    parser.add_argument('input_file', help="Path to PDF or image file")
-    parser.add_argument('--output', default='output.json', help="Output JSON path")
+    parser.add_argument('input_files', nargs='+', help="Path(s) to PDF or image files")
+    parser.add_argument('--output', default='output.json', help="Output JSON path (single input)")
+    parser.add_argument('--output-dir', default='output', help="Output directory for JSON files (multiple inputs)")
+    parser.add_argument('--tesserocr', action='store_true', help="OCR in-process with tesserocr instead of the tesseract CLI")
+    parser.add_argument('--target-dpi', type=int, help="Render PDFs at this DPI and skip downscaling (for forms with tiny print)")
+    parser.add_argument('--threshold', choices=['adaptive', 'otsu'], default='adaptive', help="Binarization method")
     args = parser.parse_args()
 
-    process_file(args.input_file, args.output)
+    if len(args.input_files) == 1:
+        process_file(args.input_files[0], args.output, use_tesserocr=args.tesserocr, target_dpi=args.target_dpi,
+                     threshold=args.threshold)
+    else:
+        process_files(args.input_files, args.output_dir, use_tesserocr=args.tesserocr, target_dpi=args.target_dpi,
+                      threshold=args.threshold)
 
 # import re
 # import json
@@ -12,4 +12,10 @@ CREATE TABLE IF NOT EXISTS forms_data (
     form_json TEXT NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (patient_id) REFERENCES patients(id)
+);
+
+-- Create ocr_cache table, keyed by input file content hash, pipeline version and settings
+CREATE TABLE IF NOT EXISTS ocr_cache (
+    hash TEXT PRIMARY KEY,
+    form_json TEXT NOT NULL
 );
\ No newline at end of file